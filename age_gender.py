@@ -4,23 +4,37 @@
     # One for age (returns an approximate age)
     # One for gender (tells Male or Female)
 # Also sorts age into a group like “21–23”
+# If asked to, recognizes returning subjects from the InsightFace embedding and can reuse their last estimate
 # If anything fails, it returns “Unknown”
 
 # Import required libraries
+import os  # For reading the face index settings from the environment
+import atexit  # For flushing the face index on shutdown
 import cv2  # OpenCV for image processing
 import numpy as np  # NumPy for numerical operations and array handling
 import logging  # Standard Python logging library for tracking errors/info
+import threading  # To load the models only once even with concurrent requests
 from typing import Dict, Union  # For type hinting dictionaries with multiple value types
-from deepface import DeepFace  # DeepFace for age estimation
-from insightface.app import FaceAnalysis  # InsightFace for gender detection
+from face_index import FaceIndex  # Embedding index for recognizing returning subjects
 
 # Setup logging system
 logger = logging.getLogger(__name__)  # Create a logger specific to this module
 logging.basicConfig(level=logging.INFO)  # Set logging level to INFO for visibility
 
-# Initialize InsightFace's face analysis model once (to avoid repeated heavy loading)
-face_app = FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])  # Load pre-trained InsightFace model with CPU backend
-face_app.prepare(ctx_id=0, det_size=(640, 640))  # Prepare the model with context ID and detection size
+# InsightFace's face analysis model, loaded once on first use (callers that skip age/gender never load it)
+face_app = None
+_model_lock = threading.Lock()
+
+def get_face_app():
+    global face_app
+    if face_app is None:
+        with _model_lock:
+            if face_app is None:
+                from insightface.app import FaceAnalysis  # InsightFace for gender detection
+                app = FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])  # Load pre-trained InsightFace model with CPU backend
+                app.prepare(ctx_id=0, det_size=(640, 640))  # Prepare the model with context ID and detection size
+                face_app = app
+    return face_app
 
 # Function to return age bucket as a string in 3-year intervals (e.g., 18–20, 21–23, ...)
 def get_age_range(age: int) -> str:
@@ -32,24 +46,71 @@ def get_age_range(age: int) -> str:
             return f"{start}-{end}"  # Return the matched age bucket
     return "80+"  # Handle senior age category separately
 
+# Returning-subject index (InsightFace embeddings), only used when the caller opts in
+# FACE_INDEX_PATH: file prefix to persist the index (env var; unset = keep it in memory only)
+# MATCH_THRESHOLD: cosine similarity needed to treat a face as the same subject
+# SUBJECT_REUSE: default for the reuse argument (env var):
+#   "off"      -> no face is stored or matched (same as without the index)
+#   "remember" -> match/enroll the face and attach a subject id, always run age estimation
+#   "reuse"    -> also return the cached age/gender of a returning subject and skip DeepFace
+#   "smooth"   -> also run DeepFace and blend the new age with the cached one
+# AGE_SMOOTHING: weight of the new age in "smooth" mode
+FACE_INDEX_PATH = os.environ.get("FACE_INDEX_PATH") or None
+MATCH_THRESHOLD = 0.5
+SUBJECT_REUSE = os.environ.get("SUBJECT_REUSE", "off")
+AGE_SMOOTHING = 0.5
+REUSE_MODES = ("off", "remember", "reuse", "smooth")
+
+# A bad SUBJECT_REUSE value must not break every request, so fall back to "off" at startup
+if SUBJECT_REUSE not in REUSE_MODES:
+    logger.warning(f"Invalid SUBJECT_REUSE={SUBJECT_REUSE!r} (expected one of {REUSE_MODES}); using 'off'")
+    SUBJECT_REUSE = "off"
+
+# Created on first use, so FACE_INDEX_PATH can still be changed before the first opted-in scan
+face_index = None
+_face_index_failed = False  # Set once loading failed, so we don't retry (and fail) on every request
+
+def get_face_index():
+    """
+    Return the subject index, or None if it could not be loaded.
+    A load failure is logged once and subject matching stays off for this process.
+    """
+    global face_index, _face_index_failed
+    if face_index is None and not _face_index_failed:
+        with _model_lock:
+            if face_index is None and not _face_index_failed:
+                try:
+                    face_index = FaceIndex(dim=512, path=FACE_INDEX_PATH)
+                    atexit.register(face_index.flush)  # Make sure pending memmap writes reach the disk
+                except Exception:
+                    _face_index_failed = True
+                    logger.error(
+                        f"Could not load the face index at {FACE_INDEX_PATH}; "
+                        "subject matching is off for this process", exc_info=True
+                    )
+    return face_index
+
 # Main function to estimate age and gender from an RGB image
-def estimate_age_gender(image_rgb: np.ndarray) -> Dict[str, Union[str, float]]:
+def estimate_age_gender(image_rgb: np.ndarray, reuse: str = None) -> Dict[str, Union[str, float]]:
     """
     Estimate age (by DeepFace) and gender (by InsightFace) using an RGB image array.
+    Unless reuse (defaults to SUBJECT_REUSE) is "off", the InsightFace embedding is matched
+    against the subject index to attach a subject id and, depending on reuse, reuse or smooth
+    the cached estimate. If the index can't be loaded, this behaves like reuse="off".
     """
-    try:
-        # Age Estimation using DeepFace 
-        df_result = DeepFace.analyze(
-            img_path=image_rgb,  # Provide image as an RGB NumPy array
-            actions=["age"],  # Right now only interested in age estimation
-            enforce_detection=False  # Skiping exception if face not detected (for safety)
-        )
-        age = round(df_result[0]["age"], 1)  # Get estimated age (rounded to 1 decimal place)
-        age_range = get_age_range(int(age))  # Convert age into an age range bucket
+    reuse = reuse or SUBJECT_REUSE
+    if reuse not in REUSE_MODES:
+        raise ValueError(f"reuse must be one of {REUSE_MODES}, got {reuse!r}")
+    index = get_face_index() if reuse != "off" else None
+    if index is None:
+        reuse = "off"  # Not opted in, or the index is unavailable
+    remember = reuse != "off"
 
-        # Gender Detection using InsightFace 
+    try:
+        # Gender Detection using InsightFace (also gives us the face embedding)
         image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)  # Convert image to BGR (required by InsightFace)
-        faces = face_app.get(image_bgr)  # Detect faces using InsightFace
+        faces = get_face_app().get(image_bgr)  # Detect faces using InsightFace
+        face = None
         if not faces:
             logger.warning("No face detected for gender detection.")  # Log a warning if no faces found
             gender = "Unknown"  # Default to unknown
@@ -58,13 +119,52 @@ def estimate_age_gender(image_rgb: np.ndarray) -> Dict[str, Union[str, float]]:
             face = max(faces, key=lambda f: f.bbox[2] * f.bbox[3])
             gender = "Male" if face.gender == 1 else "Female"  # Decode gender from model output
 
-        # Return structured results as a dictionary
-        return {
+        # Look the face up in the subject index, only when opted in (nothing is stored yet)
+        embedding = getattr(face, "normed_embedding", None) if face is not None else None
+        cached, similarity = None, 0.0
+        if remember and embedding is not None:
+            cached, similarity = index.lookup(embedding, MATCH_THRESHOLD)
+        cached_age = cached["age"] if cached and isinstance(cached["age"], (int, float)) else None
+
+        if reuse == "reuse" and cached_age is not None:
+            # Returning subject: skip DeepFace and reuse the cached estimate
+            age, gender = cached_age, cached["gender"]
+        else:
+            # Age Estimation using DeepFace (imported here so TensorFlow only loads when needed)
+            from deepface import DeepFace
+            df_result = DeepFace.analyze(
+                img_path=image_rgb,  # Provide image as an RGB NumPy array
+                actions=["age"],  # Right now only interested in age estimation
+                enforce_detection=False  # Skiping exception if face not detected (for safety)
+            )
+            age = float(df_result[0]["age"])
+
+            if reuse == "smooth" and cached_age is not None:
+                age = AGE_SMOOTHING * age + (1 - AGE_SMOOTHING) * cached_age  # Blend with the last visit
+
+            age = round(age, 1)  # Estimated age rounded to 1 decimal place
+
+        age_range = get_age_range(int(age))  # Convert age into an age range bucket
+
+        # Structured results as a dictionary
+        result = {
             "Age": age,  # Numeric age
             "Age Range": age_range,  # Bucketed age range
             "Gender": gender  # Gender string
         }
 
+        if remember:
+            subject_id, is_new = None, True
+            if embedding is not None:
+                # Match again and enroll/update in one locked step (one log line per scan)
+                record, similarity, is_new = index.match_or_add(embedding, MATCH_THRESHOLD, age, gender)
+                subject_id = record["id"]
+            result["Subject ID"] = subject_id  # Stable id for returning subjects (None if no embedding)
+            result["Returning Subject"] = not is_new  # True if matched an earlier scan
+            result["Match Score"] = round(similarity, 3)  # Cosine similarity of the best match
+
+        return result
+
     except Exception:
         # Catch-all block to log and handle any runtime errors in processing
         logger.error("Error in age/gender estimation", exc_info=True)
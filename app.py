@@ -4,6 +4,8 @@ import os
 import json
 from werkzeug.utils import secure_filename
 from main import analyze_images  # Import your core image analysis function
+from planning import parse_conditions  # Validates the requested condition names
+from age_gender import REUSE_MODES  # Allowed values for the 'reuse' field
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}}) 
@@ -22,15 +24,35 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def flag(name, default):
+    # Read a true/false request field, falling back to the default when missing
+    # Raises ValueError for anything that isn't clearly true or false
+    value = request.values.get(name)
+    if value is None or value.strip() == '':
+        return default
+    if value.strip().lower() in ('1', 'true', 'yes'):
+        return True
+    if value.strip().lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"{name} must be true or false, got {value!r}")
+
 @app.route('/analyze-face', methods=['POST'])
 def analyze_face():
     """
-    API endpoint to upload a single face image ('center'),
+    API endpoint to upload a face image ('center', plus optional 'left'/'right'),
     analyze it, save report.json, and return JSON response.
+    Form or query fields:
+      fusion=true             -> analyze each region once from its best view
+      top_k=<n>               -> number of views merged per region in fusion mode
+      conditions=oiliness,... -> only compute these conditions (default: all, "none" = no conditions)
+      age_gender=false        -> skip age & gender estimation
+      save_images=false       -> don't write landmark/ROI images to outputs/
+      reuse=off|remember|reuse|smooth -> attach a subject id, and reuse or smooth the cached
+                                         age/gender of a returning subject (default: off, nothing stored)
     """
     images = {}
 
-    # Handle only the Center image
+    # The Center image is required
     file = request.files.get('center')
     if file and allowed_file(file.filename):
         filename = secure_filename(f"center_{file.filename}")
@@ -40,9 +62,39 @@ def analyze_face():
     else:
         return jsonify({"error": "No valid image file uploaded or incorrect file format"}), 400
 
-    # Run analysis pipeline on uploaded image
+    # Left and Right views are optional
+    for view in ('Left', 'Right'):
+        file = request.files.get(view.lower())
+        if file and allowed_file(file.filename):
+            filename = secure_filename(f"{view.lower()}_{file.filename}")
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            file.save(filepath)
+            images[view] = filepath
+
+    try:
+        fusion = flag('fusion', False)
+        age_gender = flag('age_gender', True)
+        save_images = flag('save_images', True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        top_k = int(request.values.get('top_k', 1))
+    except ValueError:
+        return jsonify({"error": "top_k must be an integer"}), 400
+    try:
+        conditions = parse_conditions(request.values.get('conditions'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    reuse = request.values.get('reuse') or None
+    if reuse is not None and reuse not in REUSE_MODES:
+        return jsonify({"error": f"reuse must be one of {', '.join(REUSE_MODES)}"}), 400
+
+    # Run analysis pipeline on uploaded images
     try:
-        report = analyze_images(images)
+        report = analyze_images(
+            images, fusion=fusion, top_k=top_k, conditions=conditions,
+            age_gender=age_gender, save_images=save_images, reuse=reuse
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -4,14 +4,25 @@
 
 # Import the MediaPipe library's face mesh module
 import mediapipe as mp
+import threading  # To create the FaceMesh only once even with concurrent requests
 
 # Access the FaceMesh module from mediapipe's solutions
 mp_face_mesh = mp.solutions.face_mesh
 
-# Create a reusable FaceMesh object (to avoid reinitializing it on every call)
+# Reusable FaceMesh object, created on first use (to avoid reinitializing it on every call,
+# and to skip loading it at all when no landmarks are needed)
 # - static_image_mode=True: assumes the input is a static image (not a video stream)
 # - max_num_faces=1: limits detection to a single face for performance and simplicity
-_face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1)
+_face_mesh = None
+_face_mesh_lock = threading.Lock()
+
+def _get_face_mesh():
+    global _face_mesh
+    if _face_mesh is None:
+        with _face_mesh_lock:
+            if _face_mesh is None:
+                _face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1)
+    return _face_mesh
 
 # Define the function to detect face landmarks from an RGB image
 def detect_face_landmarks(image_rgb):
@@ -20,7 +31,7 @@ def detect_face_landmarks(image_rgb):
     Output: List of (x, y) pixel coordinates of face landmarks or None if no face found.
     """
     # Run the face mesh detector on the input image
-    results = _face_mesh.process(image_rgb)
+    results = _get_face_mesh().process(image_rgb)
 
     # If no face landmarks are detected, return None
     if not results.multi_face_landmarks:
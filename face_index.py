@@ -0,0 +1,208 @@
+# face_index.py: To recognize returning subjects from their face embedding
+
+# InsightFace already computes a 512-d face embedding for every detected face
+# This module keeps those embeddings in a small in-process index so we can:
+    # Match a new scan against everyone seen before (cosine similarity, top-k)
+    # Give every subject a stable id to attach to the report
+    # Keep the last age/gender estimate so it can be reused or smoothed
+# Optionally the index is saved to disk:
+    # <path>.npy   -> preallocated memory-mapped embedding matrix, rows are written in place
+    # <path>.jsonl -> append-only log of subject records, one line per scan (the last line for a row wins)
+# So a scan only writes one row and one log line, never the whole index.
+# The log is compacted to one line per subject when the index is loaded and whenever it grows
+# past COMPACT_FACTOR lines per subject.
+# Persistence is for a single process only: several worker processes sharing one path would
+# each keep their own row count and replace each other's .npy file when growing.
+
+import os  # For file paths
+import json  # For the subject record log
+import uuid  # For generating subject ids
+import logging  # For warnings about damaged index files
+import threading  # Flask may serve requests from several threads
+import numpy as np  # NumPy for the embedding matrix and similarity search
+
+logger = logging.getLogger(__name__)
+
+# Compact the record log once it holds more than this many lines per subject (plus some slack)
+COMPACT_FACTOR = 4
+COMPACT_MIN_LINES = 1000
+
+# Normalize rows to unit length so a dot product equals cosine similarity
+def normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class FaceIndex:
+    """
+    Matrix of normalized face embeddings with one record per subject.
+    path: optional file prefix; embeddings go to <path>.npy and records to <path>.jsonl
+    Raises ValueError if the files on disk are inconsistent (e.g. a record log without its matrix).
+    """
+
+    def __init__(self, dim=512, path=None):
+        self.dim = dim
+        self.path = path
+        self._matrix = np.empty((0, dim), dtype=np.float32)  # Row i = embedding of subject i (capacity rows)
+        self._count = 0  # Rows in use
+        self.records = []  # Row i = {"id", "age", "gender", "visits"} for subject i
+        self._log_lines = 0  # Lines currently in the record log
+        self._lock = threading.RLock()
+
+        if path:
+            if os.path.exists(f"{path}.npy"):
+                self.load()
+            elif os.path.exists(f"{path}.jsonl"):
+                # Records without their embeddings can't be matched, and appending to them would mix rows
+                raise ValueError(f"Face index at {path} has {path}.jsonl but no {path}.npy")
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def embeddings(self):
+        return self._matrix[:self._count]
+
+    def search(self, queries, k=1):
+        """
+        Batched cosine top-k.
+        queries: (n, dim) or (dim,) embeddings
+        Returns (scores, indices), each of shape (n, k'), best match first, where k' = min(k, len(index)).
+        """
+        with self._lock:
+            return self._search(normalize(queries), k)
+
+    def _search(self, queries, k):
+        k = min(k, self._count)
+        if k == 0:
+            return np.empty((len(queries), 0), np.float32), np.empty((len(queries), 0), np.int64)
+
+        sims = queries @ self.embeddings.T  # (n, count) cosine similarities
+
+        # argpartition finds the top-k in linear time, then only those k get sorted
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        return np.take_along_axis(top_sims, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def _best(self, vector, threshold):
+        # (row, similarity) of the best match at or above the threshold, else (None, similarity)
+        scores, rows = self._search(vector[None, :], 1)
+        if scores.shape[1] == 0:
+            return None, 0.0
+        similarity = float(scores[0, 0])
+        return (int(rows[0, 0]), similarity) if similarity >= threshold else (None, similarity)
+
+    def lookup(self, embedding, threshold):
+        """
+        Read-only match of a single embedding.
+        Returns (copy of the matched record or None, similarity).
+        """
+        with self._lock:
+            row, similarity = self._best(normalize(embedding)[0], threshold)
+            return (dict(self.records[row]) if row is not None else None), similarity
+
+    def match_or_add(self, embedding, threshold, age=None, gender=None):
+        """
+        Match a face again and enroll or update it in one locked step, so two concurrent
+        first visits of the same subject can't both miss and create two ids.
+        Stores the age/gender of this scan and writes a single log line.
+        Returns (record, similarity, is_new).
+        A returning subject's embedding becomes the running average over its visits.
+        """
+        vector = normalize(embedding)[0]
+        with self._lock:
+            row, similarity = self._best(vector, threshold)
+
+            if row is not None:
+                record = self.records[row]
+                visits = record["visits"]
+                mean = (self._matrix[row] * visits + vector) / (visits + 1)
+                self._matrix[row] = normalize(mean)[0]
+                record.update(age=age, gender=gender, visits=visits + 1)
+                is_new = False
+            else:
+                if self._count == len(self._matrix):
+                    self._grow()
+                row = self._count
+                self._matrix[row] = vector
+                self._count += 1
+                self.records.append({"id": uuid.uuid4().hex[:12], "age": age, "gender": gender, "visits": 1})
+                is_new = True
+
+            self._log(row)
+            return dict(self.records[row]), similarity, is_new
+
+    def _grow(self):
+        # Double the capacity (amortized O(1) per add); on disk the memmap file is reallocated
+        capacity = max(16, 2 * len(self._matrix))
+        if not self.path:
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:self._count] = self.embeddings
+            self._matrix = grown
+            return
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        # Write the bigger matrix to a temp file and swap it in, so a half-written index is never read
+        grown = np.lib.format.open_memmap(
+            f"{self.path}.tmp.npy", mode='w+', dtype=np.float32, shape=(capacity, self.dim)
+        )
+        grown[:self._count] = self.embeddings
+        grown.flush()
+        del grown
+        self._matrix = None  # Drop the old mapping before replacing its file
+        os.replace(f"{self.path}.tmp.npy", f"{self.path}.npy")
+        self._matrix = np.load(f"{self.path}.npy", mmap_mode='r+')
+
+    def _log(self, row):
+        # Append one record line (no-op without a path); the embedding row is already in the memmap
+        if not self.path:
+            return
+        with open(f"{self.path}.jsonl", 'a') as f:
+            f.write(json.dumps({"row": row, **self.records[row]}) + "\n")
+        self._log_lines += 1
+
+        if self._log_lines > max(COMPACT_MIN_LINES, COMPACT_FACTOR * self._count):
+            self._compact()
+
+    def _compact(self):
+        # Rewrite the log with one line per subject (temp file + swap, so a crash keeps the old log)
+        with open(f"{self.path}.tmp.jsonl", 'w') as f:
+            for row, record in enumerate(self.records):
+                f.write(json.dumps({"row": row, **record}) + "\n")
+        os.replace(f"{self.path}.tmp.jsonl", f"{self.path}.jsonl")
+        self._log_lines = self._count
+
+    def flush(self):
+        # Push pending memmap writes to disk (e.g. at shutdown)
+        with self._lock:
+            if isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+
+    def load(self):
+        # Memory-map the saved embeddings (read/write, updated in place) and replay the record log
+        matrix = np.load(f"{self.path}.npy", mmap_mode='r+')
+        records = {}
+        if os.path.exists(f"{self.path}.jsonl"):
+            with open(f"{self.path}.jsonl") as f:
+                for number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                        records[int(entry.pop("row"))] = entry
+                    except (ValueError, KeyError, TypeError):
+                        # Typically a half-written last line from a process killed mid-append
+                        logger.warning(f"Skipping unreadable line {number} in {self.path}.jsonl")
+
+        count = len(records)
+        if matrix.shape[1] != self.dim or count > matrix.shape[0] or set(records) != set(range(count)):
+            raise ValueError(f"Face index at {self.path} is inconsistent")
+
+        with self._lock:
+            self._matrix, self._count = matrix, count
+            self.records = [records[row] for row in range(count)]
+            self._compact()  # Drop superseded and unreadable lines
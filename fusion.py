@@ -0,0 +1,165 @@
+# fusion.py: To merge Center, Left and Right views into one result per face region
+
+# When more than one view is given, regions like forehead, lips and nose show up in every view
+# Instead of analyzing each copy, this module:
+    # Scores every candidate crop by sharpness, size and head-pose angle
+    # Picks the best view (or the best top-k views) for each region
+    # Merges the per-view results into one verdict per condition
+
+# Sharpness is NOT the Laplacian variance the analyzers use (Wrinkles, Clogged Pores, Dryness, Dry Lips),
+# otherwise fusion would always pick the most textured crop and bias those verdicts.
+# Instead it is the gradient energy of a blurred, half-size crop (fine skin texture is smoothed away)
+# and it is capped at SHARP_ENOUGH: it only penalizes blurry crops and never favors a sharper-than-enough one.
+
+import cv2  # OpenCV for grayscale conversion, blurring and gradients
+import numpy as np  # NumPy for masks and averaging
+
+from roi_analysis import build_result  # Same result format as the per-view analysis
+
+# Regions each view is allowed to contribute (profile views only see their own side)
+VIEW_REGIONS = {
+    "Center": None,  # None = every extracted region
+    "Left": {"forehead", "lips", "nose", "left_eye", "left_cheek"},
+    "Right": {"forehead", "lips", "nose", "right_eye", "right_cheek"},
+}
+
+# Landmarks used for the head-pose (yaw) estimate
+NOSE_TIP, FACE_LEFT_EDGE, FACE_RIGHT_EDGE = 1, 234, 454
+
+# Mean gradient magnitude (blurred, half-size crop) above which a crop counts as fully sharp
+SHARP_ENOUGH = 8.0
+
+# Lowest pose factor, so a bad angle for every view still leaves the sharpness/size ranking in place
+POSE_FLOOR = 0.05
+
+# Preferred yaw per region (-1 = fully turned to image-left, 0 = frontal, 1 = image-right)
+# Central regions are best seen straight on, side regions when turned slightly towards the camera
+PREFERRED_YAW = {
+    "forehead": 0.0, "nose": 0.0, "lips": 0.0,
+    "left_eye": 0.35, "left_cheek": 0.35,
+    "right_eye": -0.35, "right_cheek": -0.35,
+}
+
+def estimate_yaw(landmarks):
+    """
+    Rough yaw from where the nose tip sits between the two face edges.
+    Returns a value in [-1, 1]; 0 means the face looks straight at the camera.
+    """
+    if len(landmarks) <= max(NOSE_TIP, FACE_LEFT_EDGE, FACE_RIGHT_EDGE):
+        return 0.0  # Not enough points, treat as frontal
+
+    left_x, right_x = landmarks[FACE_LEFT_EDGE][0], landmarks[FACE_RIGHT_EDGE][0]
+    span = right_x - left_x
+    if span == 0:
+        return 0.0
+
+    ratio = (landmarks[NOSE_TIP][0] - left_x) / span  # 0.5 when the nose is centered
+    return float(np.clip(2 * ratio - 1, -1.0, 1.0))
+
+def roi_quality(roi):
+    """
+    Sharpness score (0-1, capped) and size of a masked ROI crop.
+    Only skin pixels (non-black) count, so the masked-out corners do not fake sharpness.
+    """
+    gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+    mask = (gray > 0).astype(np.uint8)
+    area = int(mask.sum())
+    if area == 0:
+        return 0.0, 0
+
+    # Blur and downsample so only coarse edges (eyes, lips, nose outline) carry gradient energy
+    small = cv2.pyrDown(cv2.GaussianBlur(gray, (5, 5), 0))
+    small_mask = cv2.resize(mask, (small.shape[1], small.shape[0]), interpolation=cv2.INTER_NEAREST)
+
+    # Erode the mask so the hard edge of the crop is not counted as an edge
+    inner = cv2.erode(small_mask, np.ones((3, 3), np.uint8)).astype(bool)
+    if not inner.any():
+        return 0.0, area
+
+    gx = cv2.Sobel(small, cv2.CV_64F, 1, 0)
+    gy = cv2.Sobel(small, cv2.CV_64F, 0, 1)
+    energy = float(np.mean(np.hypot(gx, gy)[inner]))
+    return min(1.0, energy / SHARP_ENOUGH), area
+
+def score_candidates(candidates, top_k=1):
+    """
+    candidates: list of (view, region, roi, yaw)
+    Returns dict region -> list of (score, view, roi), best first.
+    Size is normalized against the biggest candidate of the same region;
+    sharpness is already a capped 0-1 score.
+    Regions with no more than top_k candidates are all analyzed anyway, so they
+    are not scored (score None, in input order).
+    """
+    by_region = {}
+    for view, region, roi, yaw in candidates:
+        by_region.setdefault(region, []).append((view, roi, yaw))
+
+    ranked = {}
+    for region, items in by_region.items():
+        if len(items) <= top_k:
+            ranked[region] = [(None, view, roi) for view, roi, _ in items]  # Nothing to choose between
+            continue
+
+        quality = [roi_quality(roi) for _, roi, _ in items]
+        max_area = max(area for _, area in quality) or 1
+        preferred = PREFERRED_YAW.get(region, 0.0)
+
+        scored = []
+        for (view, roi, yaw), (sharpness, area) in zip(items, quality):
+            pose = max(POSE_FLOOR, 1.0 - abs(yaw - preferred))  # 1 = ideal angle for this region
+            score = sharpness * (area / max_area) * pose
+            scored.append((round(score, 4), view, roi))
+
+        scored.sort(key=lambda s: s[0], reverse=True)
+        ranked[region] = scored
+
+    return ranked
+
+def merge_results(results):
+    """
+    results: list of (score, analysis dict) for one region, best first
+             (score None = not scored, weighted equally).
+    Each condition value is averaged, weighted by view score, and re-checked
+    against the best view's threshold so the region gets a single verdict.
+    When views used different thresholds (Dryness picks its threshold from each
+    view's brightness), the verdict is a score-weighted vote of the per-view verdicts instead.
+    """
+    results = [(1.0 if score is None else score, r) for score, r in results]
+    best = results[0][1]
+    if len(results) == 1:
+        return dict(best)
+
+    merged = {}
+    for condition, res in best.items():
+        if not isinstance(res, dict) or "value" not in res:
+            merged[condition] = res
+            continue
+
+        pairs = [(score, r[condition]["value"]) for score, r in results if condition in r]
+        weight = sum(score for score, _ in pairs)
+        if weight > 0:
+            value = sum(score * v for score, v in pairs) / weight
+        else:
+            value = np.mean([v for _, v in pairs])
+
+        thresholds = {r[condition]["threshold"] for _, r in results if condition in r}
+        if len(thresholds) == 1:
+            merged[condition] = build_result(value, res["threshold"], res["comparison"])
+            continue
+
+        # Thresholds differ per view, so one threshold can't judge the averaged value
+        votes = {}
+        for score, r in results:
+            if condition in r:
+                detected = r[condition]["detected"]
+                votes[detected] = votes.get(detected, 0) + (score if weight > 0 else 1)
+        top = max(votes.values())
+        winners = [label for label, v in votes.items() if v == top]
+        merged[condition] = {
+            "value": round(float(value), 2),
+            "threshold": res["threshold"],
+            "comparison": res["comparison"],
+            "detected": res["detected"] if res["detected"] in winners else winners[0]  # Ties go to the best view
+        }
+
+    return merged
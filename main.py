@@ -26,6 +26,10 @@ from roi_analysis import (                               # Import all region-spe
 )
 from visualization import draw_landmarks                 # For drawing and saving landmarks on image
 from age_gender import estimate_age_gender               # For estimating age and gender using models
+from fusion import (                                     # For picking the best view per region
+    VIEW_REGIONS, estimate_yaw, score_candidates, merge_results
+)
+from planning import parse_conditions, plan_analysis     # For skipping work the client did not ask for
 
 # Constants
 UPLOAD_FOLDER, OUTPUT_FOLDER = 'uploads', 'outputs'
@@ -38,12 +42,42 @@ def convert(o):
         return o.item()  # Convert NumPy scalar to native Python scalar
     raise TypeError
 
-def analyze_images(images):
+def analyze_roi(r, roi, conditions=None):
+    """
+    Dispatch a single ROI to its analyze_<region>_roi function
+    (left_/right_ prefixes share the same analysis).
+    conditions: condition labels to compute for this ROI (None = all).
+    """
+    normalized_r = r.replace("left_", "").replace("right_", "")
+    fn = f"analyze_{normalized_r}_roi"
+
+    if fn in globals():
+        return globals()[fn](roi, conditions)
+
+    print(f"No analysis function for region: {r}")
+    return {"error": f"No analysis function defined for region: {r}"}
+
+def save_roi(view, r, roi):
+    out = os.path.join(OUTPUT_FOLDER, f"{view.lower()}_{r}.jpg")
+    cv2.imwrite(out, cv2.cvtColor(roi, cv2.COLOR_RGB2BGR))
+
+def analyze_images(images, fusion=False, top_k=1, conditions=None, age_gender=True, save_images=True,
+                   reuse=None):
     """
     images: dict with keys 'Center', 'Left', 'Right', values are image file paths or None
+    fusion: if True, each region is analyzed only in its best view(s) and the
+            report holds one consolidated verdict per region under "Fused"
+    top_k: number of best views to analyze and merge per region in fusion mode
+    conditions: condition keys to compute, e.g. "oiliness,acne" or {"oiliness", "acne"}
+                (None = all); regions and color conversions they don't need are skipped
+    age_gender: set to False to skip the age/gender models
+    save_images: set to False to skip writing landmark and ROI images to outputs/
+    reuse: "off", "remember", "reuse" or "smooth" for returning subjects (None = age_gender.SUBJECT_REUSE)
     Returns a report dictionary with all analyses.
     """
+    plan = plan_analysis(parse_conditions(conditions), age_gender)  # Minimum work for the requested outputs
     report = {}
+    candidates = []  # (view, region, roi, yaw) collected for fusion mode
 
     for view, fp in images.items():
         if not fp:
@@ -52,43 +86,65 @@ def analyze_images(images):
         img = preprocess_image(fp)  # Resize and convert image to RGB
         vr = {}  # Dictionary for this view's results
 
-        if view == "Center":
-            vr["Age/Gender"] = estimate_age_gender(img)  # Estimate age and gender for front-facing image
+        if view == "Center" and plan["age_gender"]:
+            vr["Age/Gender"] = estimate_age_gender(img, reuse)  # Estimate age and gender for front-facing image
+
+        if not plan["landmarks"]:
+            # No skin condition requested, so landmarks and ROIs are not needed
+            if vr:
+                report[view] = vr
+            continue
 
         lms = detect_face_landmarks(img)  # Get list of (x, y) facial landmarks
         if not lms:
             print(f"No face in {view}")  # Notify if no face was detected
             continue
 
-        draw_landmarks(img, lms, view)  # Annotate and save landmarks on face
-
-        rois = extract_rois(img, lms)  # Extract ROIs (e.g., forehead, lips) based on landmarks
-
-        # Define valid ROIs for each view
-        if view == "Left":
-            valid_regions = {"forehead", "lips", "nose", "left_eye", "left_cheek"}
-        elif view == "Right":
-            valid_regions = {"forehead", "lips", "nose", "right_eye", "right_cheek"}
-        else:  # Center
-            valid_regions = set(rois.keys())  # Analyze everything
-
-        for r, roi in rois.items():
-            if r not in valid_regions:
-                continue  # Skip non-relevant regions
+        if save_images:
+            draw_landmarks(img, lms, view)  # Annotate and save landmarks on face
 
-            out = os.path.join(OUTPUT_FOLDER, f"{view.lower()}_{r}.jpg")
-            cv2.imwrite(out, cv2.cvtColor(roi, cv2.COLOR_RGB2BGR))
+        rois = extract_rois(img, lms, plan["rois"])  # Extract only the planned ROIs (e.g., forehead, lips)
 
-            normalized_r = r.replace("left_", "").replace("right_", "")
-            fn = f"analyze_{normalized_r}_roi"
+        # Valid ROIs for this view (Center analyzes everything)
+        valid_regions = VIEW_REGIONS.get(view) or set(rois.keys())
 
-            if fn in globals():
-                vr[r] = globals()[fn](roi)
-            else:
-                print(f"No analysis function for region: {r}")
-                vr[r] = {"error": f"No analysis function defined for region: {r}"}
-
-        report[view] = vr  # Add results for this view to the report
+        if fusion:
+            # Defer analysis until every view has been scored
+            yaw = estimate_yaw(lms)
+            candidates += [(view, r, roi, yaw) for r, roi in rois.items() if r in valid_regions]
+        else:
+            for r, roi in rois.items():
+                if r not in valid_regions:
+                    continue  # Skip non-relevant regions
+
+                if save_images:
+                    save_roi(view, r, roi)
+                vr[r] = analyze_roi(r, roi, plan["rois"][r])
+
+        if vr or not fusion:
+            report[view] = vr  # Add results for this view to the report
+
+    if fusion:
+        fused, sources = {}, {}
+
+        # Analyze each region only in its top-k views, then merge into one verdict
+        top_k = max(1, top_k)
+        for r, ranked in score_candidates(candidates, top_k).items():
+            chosen = ranked[:top_k]
+            results = []
+            for score, view, roi in chosen:
+                if save_images:
+                    save_roi(view, r, roi)
+                results.append((score, analyze_roi(r, roi, plan["rois"][r])))
+
+            fused[r] = merge_results(results)
+            sources[r] = {
+                "views": [view for _, view, _ in chosen],
+                "scores": {view: score for score, view, _ in ranked}  # None = not scored (no choice to make)
+            }
+
+        report["Fused"] = fused
+        report["Sources"] = sources  # Which view(s) each fused region came from
 
     return report
 
@@ -109,7 +165,12 @@ if __name__ == "__main__":
         else:
             print(f"Skipping {view}.")
 
-    report = analyze_images(images)
+    # Fuse views when more than one image was given
+    fusion = sum(1 for fp in images.values() if fp) > 1
+    if fusion:
+        fusion = input("Fuse views into one result per region? (y/n): ").strip().lower() == 'y'
+
+    report = analyze_images(images, fusion=fusion)
 
     # Save the final report to a JSON file
     with open(REPORT_FILE, 'w') as f:
@@ -0,0 +1,65 @@
+# planning.py: To work out the minimum pipeline work for the outputs a client asked for
+
+# A client can ask for just a few conditions (e.g. oiliness, acne) and/or skip age & gender
+# This module turns that request into a plan:
+    # Whether the age/gender models need to run
+    # Whether landmark detection is needed at all
+    # Which ROIs to extract, and which conditions to compute in each
+# Anything not in the plan is skipped (no model inference, no crop, no color conversion)
+# Models are loaded on first use, so a skipped model is never even loaded
+
+from roi_analysis import CONDITION_DEPENDENCIES, condition_key  # What each analyzer needs
+from roi_extraction import ROI_LANDMARKS  # All ROIs the extractor knows about
+
+# Map an ROI name to the analyzer region it uses (left_cheek -> cheek, etc.)
+def roi_region(roi_name):
+    return roi_name.replace("left_", "").replace("right_", "")
+
+# Every condition key a client may request, e.g. {"oiliness", "acne", "dark_circles", ...}
+def available_conditions():
+    return {condition_key(label) for labels in CONDITION_DEPENDENCIES.values() for label in labels}
+
+def parse_conditions(value):
+    """
+    Parse a comma-separated list like "oiliness,acne" into a set of condition keys.
+    None or an empty string returns None (meaning: all conditions).
+    "none" or an empty collection returns an empty set (meaning: no conditions).
+    Raises ValueError for unknown condition names.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+        if value.strip().lower() == "none":
+            return set()
+        value = value.split(",")
+
+    keys = {condition_key(v) for v in value if v and v.strip()}
+
+    unknown = keys - available_conditions()
+    if unknown:
+        raise ValueError(f"Unknown condition(s): {', '.join(sorted(unknown))}")
+    return keys
+
+def plan_analysis(conditions=None, age_gender=True):
+    """
+    conditions: set of condition keys to compute, or None for all of them
+    age_gender: whether to run age & gender estimation
+    Returns a plan dict:
+      "age_gender": bool
+      "landmarks": bool (False when no skin condition is needed)
+      "rois": {roi_name: set of condition labels to compute}
+    """
+    rois = {}
+    for roi_name in ROI_LANDMARKS:
+        labels = CONDITION_DEPENDENCIES.get(roi_region(roi_name), {})
+        wanted = {label for label in labels if conditions is None or condition_key(label) in conditions}
+        if wanted:
+            rois[roi_name] = wanted
+
+    return {
+        "age_gender": bool(age_gender),
+        "landmarks": bool(rois),
+        "rois": rois,
+    }
@@ -33,89 +33,191 @@ def build_result(value, threshold, comparison='>', label_positive='Yes', label_n
         "detected": label_positive if ok else label_negative  # Final detection result
     }
 
+# Registry of what each condition depends on: region -> {condition label: color spaces used}
+# The pipeline planner reads this to skip regions no one asked for; the analyzers only compute
+# the conditions listed here, and convert color spaces lazily on first use (see RoiFeatures)
+CONDITION_DEPENDENCIES = {
+    "forehead": {
+        "Oiliness": {"hsv"},
+        "Dryness": {"hsv", "gray"},
+        "Pigmentation": {"lab"},
+        "Redness": {"lab"},
+        "Wrinkles": {"gray"},
+    },
+    "cheek": {
+        "Oiliness": {"hsv"},
+        "Dryness": {"hsv", "gray"},
+        "Acne": {"gray"},
+        "Pigmentation": {"lab"},
+        "Redness": {"lab"},
+    },
+    "nose": {
+        "Shiny Nose": {"hsv"},
+        "Blackheads": {"gray"},
+        "Clogged Pores": {"gray"},
+    },
+    "lips": {
+        "Dry Lips": {"gray"},
+        "Discoloration": {"lab"},
+    },
+    "eye": {
+        "Dark Circles": {"hsv"},
+        "Wrinkles (Crow's Feet)": {"gray"},
+        "Puffy Eyes": {"gray"},
+        "Open Pores": {"gray"},
+    },
+}
+
+# OpenCV conversion code for each color space an analyzer can ask for
+COLOR_CONVERSIONS = {
+    "hsv": cv2.COLOR_RGB2HSV,
+    "lab": cv2.COLOR_RGB2LAB,
+    "gray": cv2.COLOR_RGB2GRAY,
+}
+
+# Turn a condition label into the key clients use, e.g. "Wrinkles (Crow's Feet)" -> "wrinkles_crows_feet"
+def condition_key(label):
+    cleaned = "".join(c if c.isalnum() else " " for c in label.lower().replace("'", ""))
+    return "_".join(cleaned.split())
+
+# Labels to compute for a region (conditions=None means every condition of that region)
+def wanted_conditions(region, conditions=None):
+    labels = CONDITION_DEPENDENCIES[region]
+    if conditions is None:
+        return set(labels)
+    return set(labels) & set(conditions)
+
+class RoiFeatures:
+    """
+    Color spaces and shared statistics of one ROI, computed on first use and cached.
+    Conditions that share a statistic (e.g. Oiliness and Dryness both use brightness)
+    compute it once, and nothing is computed for conditions that were not asked for.
+    """
+
+    def __init__(self, roi):
+        self.roi = roi
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def space(self, name):
+        return self._cached(name, lambda: cv2.cvtColor(self.roi, COLOR_CONVERSIONS[name]))
+
+    @property
+    def hsv(self):
+        return self.space("hsv")
+
+    @property
+    def lab(self):
+        return self.space("lab")
+
+    @property
+    def gray(self):
+        return self.space("gray")
+
+    @property
+    def brightness(self):
+        # Mean of the HSV V channel
+        return self._cached("brightness", lambda: np.mean(self.hsv[:, :, 2]))
+
+    @property
+    def lap_var(self):
+        # Laplacian variance of the grayscale ROI (texture)
+        return self._cached("lap_var", lambda: cv2.Laplacian(self.gray, cv2.CV_64F).var())
+
 # Analysis functions
-def analyze_forehead_roi(roi):
+# Each takes an optional set of condition labels; only those are computed (None = all)
+def analyze_forehead_roi(roi, conditions=None):
     result = {}
-    hsv = cv2.cvtColor(roi, cv2.COLOR_RGB2HSV)
-    lab = cv2.cvtColor(roi, cv2.COLOR_RGB2LAB)
-    gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+    want = wanted_conditions("forehead", conditions)
+    f = RoiFeatures(roi)
 
-    v_channel = hsv[:, :, 2]
-    avg_brightness = np.mean(v_channel)
-    result["Oiliness"] = build_result(avg_brightness, 170)
+    if "Oiliness" in want:
+        result["Oiliness"] = build_result(f.brightness, 170)
 
-    lap_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-    if avg_brightness < 100:
-        result["Dryness"] = build_result(lap_var, 120, '<')  # more sensitive
-    else:
-        result["Dryness"] = build_result(lap_var, 100, '<')  # less sensitive but still allow detection
+    if "Dryness" in want:
+        if f.brightness < 100:
+            result["Dryness"] = build_result(f.lap_var, 120, '<')  # more sensitive
+        else:
+            result["Dryness"] = build_result(f.lap_var, 100, '<')  # less sensitive but still allow detection
 
-    std_dev_l = np.std(lab[:, :, 0])
-    result["Pigmentation"] = build_result(std_dev_l, 12)
+    if "Pigmentation" in want:
+        std_dev_l = np.std(f.lab[:, :, 0])
+        result["Pigmentation"] = build_result(std_dev_l, 12)
 
     # Redness detection using LAB B channel (higher = redder)
-    b_channel = lab[:, :, 2]
-    result["Redness"] = build_result(np.mean(b_channel), 145)
+    if "Redness" in want:
+        b_channel = f.lab[:, :, 2]
+        result["Redness"] = build_result(np.mean(b_channel), 145)
 
-    result["Wrinkles"] = build_result(lap_var, 350)
+    if "Wrinkles" in want:
+        result["Wrinkles"] = build_result(f.lap_var, 350)
 
     return result
 
-def analyze_cheek_roi(roi):
+def analyze_cheek_roi(roi, conditions=None):
     result = {}
-    hsv = cv2.cvtColor(roi, cv2.COLOR_RGB2HSV)
-    lab = cv2.cvtColor(roi, cv2.COLOR_RGB2LAB)
-    gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+    want = wanted_conditions("cheek", conditions)
+    f = RoiFeatures(roi)
 
-    v_channel = hsv[:, :, 2]
-    avg_brightness = np.mean(v_channel)
-    result["Oiliness"] = build_result(avg_brightness, 170)
+    if "Oiliness" in want:
+        result["Oiliness"] = build_result(f.brightness, 170)
 
-    lap_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-    if avg_brightness < 100:
-        result["Dryness"] = build_result(lap_var, 120, '<')  # more sensitive
-    else:
-        result["Dryness"] = build_result(lap_var, 100, '<')  # less sensitive but still allow detection
+    if "Dryness" in want:
+        if f.brightness < 100:
+            result["Dryness"] = build_result(f.lap_var, 120, '<')  # more sensitive
+        else:
+            result["Dryness"] = build_result(f.lap_var, 100, '<')  # less sensitive but still allow detection
 
-    edges = cv2.Canny(gray, 100, 200)
-    edge_density = np.sum(edges) / (gray.shape[0] * gray.shape[1])
-    result["Acne"] = build_result(edge_density, 0.12)
+    if "Acne" in want:
+        gray = f.gray
+        edges = cv2.Canny(gray, 100, 200)
+        edge_density = np.sum(edges) / (gray.shape[0] * gray.shape[1])
+        result["Acne"] = build_result(edge_density, 0.12)
 
-    std_dev_l = np.std(lab[:, :, 0])
-    result["Pigmentation"] = build_result(std_dev_l, 12)
+    if "Pigmentation" in want:
+        std_dev_l = np.std(f.lab[:, :, 0])
+        result["Pigmentation"] = build_result(std_dev_l, 12)
 
-    b_channel = lab[:, :, 2]
-    result["Redness"] = build_result(np.mean(b_channel), 145)
+    if "Redness" in want:
+        b_channel = f.lab[:, :, 2]
+        result["Redness"] = build_result(np.mean(b_channel), 145)
 
     return result
 
-def analyze_nose_roi(roi):
+def analyze_nose_roi(roi, conditions=None):
     result = {}
-    hsv = cv2.cvtColor(roi, cv2.COLOR_RGB2HSV)
-    gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+    want = wanted_conditions("nose", conditions)
+    f = RoiFeatures(roi)
 
-    avg_brightness = np.mean(hsv[:, :, 2])
-    result["Shiny Nose"] = build_result(avg_brightness, 170)
+    if "Shiny Nose" in want:
+        result["Shiny Nose"] = build_result(f.brightness, 170)
 
-    black_pixel_ratio = np.sum(gray < 50) / (gray.shape[0] * gray.shape[1])
-    result["Blackheads"] = build_result(black_pixel_ratio, 0.1)
+    if "Blackheads" in want:
+        gray = f.gray
+        black_pixel_ratio = np.sum(gray < 50) / (gray.shape[0] * gray.shape[1])
+        result["Blackheads"] = build_result(black_pixel_ratio, 0.1)
 
-    lap_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-    result["Clogged Pores"] = build_result(lap_var, 180)
+    if "Clogged Pores" in want:
+        result["Clogged Pores"] = build_result(f.lap_var, 180)
 
     return result
 
-def analyze_lips_roi(roi):
+def analyze_lips_roi(roi, conditions=None):
     result = {}
-    lab = cv2.cvtColor(roi, cv2.COLOR_RGB2LAB)
-    gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+    want = wanted_conditions("lips", conditions)
+    f = RoiFeatures(roi)
 
-    lap_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-    result["Dry Lips"] = build_result(lap_var, 120, '<')
+    if "Dry Lips" in want:
+        result["Dry Lips"] = build_result(f.lap_var, 120, '<')
 
-    a_channel = lab[:, :, 1]
-    mean_a = np.mean(a_channel)
-    result["Discoloration"] = build_result(abs(mean_a - 150), 15)
+    if "Discoloration" in want:
+        a_channel = f.lab[:, :, 1]
+        mean_a = np.mean(a_channel)
+        result["Discoloration"] = build_result(abs(mean_a - 150), 15)
 
     return result
 
@@ -147,21 +249,24 @@ def analyze_lips_roi(roi):
 
 #     return result
 
-def analyze_eye_roi(roi):
+def analyze_eye_roi(roi, conditions=None):
     result = {}
-    hsv = cv2.cvtColor(roi, cv2.COLOR_RGB2HSV)
-    gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+    want = wanted_conditions("eye", conditions)
+    f = RoiFeatures(roi)
 
-    avg_v = np.mean(hsv[:, :, 2])
-    result["Dark Circles"] = build_result(avg_v, 70, '<')
+    if "Dark Circles" in want:
+        result["Dark Circles"] = build_result(f.brightness, 70, '<')
 
-    lap_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-    result["Wrinkles (Crow's Feet)"] = build_result(lap_var, 300)
+    if "Wrinkles (Crow's Feet)" in want:
+        result["Wrinkles (Crow's Feet)"] = build_result(f.lap_var, 300)
 
-    edge_strength = np.sum(cv2.Canny(gray, 50, 150)) / (gray.shape[0] * gray.shape[1])
-    result["Puffy Eyes"] = build_result(edge_strength, 5, '<')
+    if "Puffy Eyes" in want:
+        gray = f.gray
+        edge_strength = np.sum(cv2.Canny(gray, 50, 150)) / (gray.shape[0] * gray.shape[1])
+        result["Puffy Eyes"] = build_result(edge_strength, 5, '<')
 
-    texture_std = np.std(gray)
-    result["Open Pores"] = build_result(texture_std, 40)
+    if "Open Pores" in want:
+        texture_std = np.std(f.gray)
+        result["Open Pores"] = build_result(texture_std, 40)
 
     return result
\ No newline at end of file
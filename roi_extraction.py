@@ -14,7 +14,7 @@ ROI_LANDMARKS = {
     'right_cheek': [280, 425, 411]         # Right cheekbone area
 }
 
-def extract_rois(image: np.ndarray, landmarks: list) -> dict:
+def extract_rois(image: np.ndarray, landmarks: list, regions=None) -> dict:
     """
     Extract skin regions exactly by:
       1. Computing adaptive padding from inter-ocular distance.
@@ -22,6 +22,8 @@ def extract_rois(image: np.ndarray, landmarks: list) -> dict:
       3. Cleaning up the mask with morphological operations.
       4. Cropping the masked region with adaptive padding.
 
+    regions: optional collection of region names to extract (None = all).
+
     Returns a dict of region_name -> ROI image patch.
     """
     h, w, _ = image.shape
@@ -41,6 +43,9 @@ def extract_rois(image: np.ndarray, landmarks: list) -> dict:
     rois = {}
 
     for name, idxs in ROI_LANDMARKS.items():
+        if regions is not None and name not in regions:
+            continue  # Skip regions nobody asked for
+
         # 2. Gather the landmark points for this region
         pts = [landmarks[i] for i in idxs if i < len(landmarks)]
 